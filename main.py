@@ -1,15 +1,24 @@
 
 import os
-import json
+import time
+import asyncio
+import hashlib
+import hmac
+import secrets
+import sqlite3
 import logging
+import threading
 import httpx
+import orjson
 import uvicorn
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Any
 from fastapi import FastAPI, Request, HTTPException, Depends, status, UploadFile, File, Header
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict
 from dotenv import load_dotenv
 
 # Load Env (for local dev)
@@ -17,7 +26,8 @@ load_dotenv()
 
 # ============ Configuration ============
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, 'data.json')
+DB_FILE = os.path.join(BASE_DIR, 'data.db')
+DATA_FILE = os.path.join(BASE_DIR, 'data.json') # Legacy storage, imported once into DB_FILE
 CLIENT_FILE = os.path.join(BASE_DIR, 'client.html')
 ADMIN_FILE = os.path.join(BASE_DIR, 'admin.html')
 SUCCESS_FILE = os.path.join(BASE_DIR, 'success.html')
@@ -32,13 +42,52 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 PAYPAL_API_BASE = 'https://api-m.sandbox.paypal.com' if PAYPAL_SANDBOX else 'https://api-m.paypal.com'
 OMR_TO_USD_RATE = 2.6
+TELEGRAM_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage" if TELEGRAM_BOT_TOKEN else None
+
+TELEGRAM_ORDER_TEMPLATE = """
+🛒 *سفارش جدید* (#{id})
+
+👤 *مشتری:* {first_name} {last_name}
+📞 *تلفن:* {phone}
+📍 *آدرس:* {address}
+{location_line}
+
+📦 *محصولات:*
+{items_text}
+
+💰 *مبلغ کل:* {total_omr:.2f} OMR
+💵 *پرداخت شده:* {total_usd:.2f} USD
+
+🚚 *تحویل:* {delivery}
+📝 *توضیحات:* {notes}
+"""
 
 # Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("RoyalRestaurant")
 
 # ============ FastAPI App ============
-app = FastAPI(title="Royal Restaurant API")
+class ORJSONResponse(JSONResponse):
+    # Serializes responses with orjson (C) instead of the stdlib json encoder
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared HTTP client so PayPal/Telegram calls reuse pooled keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        timeout=httpx.Timeout(10.0)
+    )
+    # Pending fire-and-forget tasks (kept referenced so they aren't garbage collected)
+    app.state.bg = set()
+    yield
+    await asyncio.gather(*app.state.bg, return_exceptions=True)
+    await app.state.http.aclose()
+    db.close()
+
+app = FastAPI(title="Royal Restaurant API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -49,13 +98,19 @@ app.add_middleware(
 )
 
 # ============ Security ============
+def is_admin_token(token: Optional[str]) -> bool:
+    # Constant-time comparison so response timing doesn't leak the token
+    return hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode())
+
 async def verify_admin(x_admin_token: str = Header(None)):
-    if x_admin_token != ADMIN_TOKEN:
+    if not is_admin_token(x_admin_token):
         raise HTTPException(status_code=403, detail="Invalid Admin Token")
     return True
 
 # ============ Data Models ============
 class Translatable(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     fa: str
     en: str
     ar: str
@@ -70,14 +125,20 @@ class Product(BaseModel):
     image: str
 
 class Category(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: Translatable
 
 class CartItem(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     quantity: int
 
 class Customer(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     firstName: str
     lastName: str
     phone: str
@@ -91,47 +152,267 @@ class OrderRequest(BaseModel):
     customer: Customer
     items: List[CartItem]
 
+class LoginRequest(BaseModel):
+    token: str
+
+class OrderStatusUpdate(BaseModel):
+    id: str
+    status: str
+
 # ============ Data Manager ============
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name_json TEXT NOT NULL,
+    description_json TEXT NOT NULL,
+    price REAL NOT NULL,
+    discount INTEGER NOT NULL DEFAULT 0,
+    category TEXT NOT NULL,
+    image TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id TEXT PRIMARY KEY,
+    name_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    customer_json TEXT NOT NULL,
+    items_json TEXT NOT NULL,
+    total_omr REAL NOT NULL,
+    total_usd REAL NOT NULL,
+    status TEXT NOT NULL,
+    paid INTEGER NOT NULL DEFAULT 0,
+    paypal_order_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_paypal_order_id ON orders(paypal_order_id);
+"""
+
 class DataManager:
     def __init__(self):
-        self.ensure_data_file()
-
-    def ensure_data_file(self):
-        if not os.path.exists(DATA_FILE):
-            initial_data = {
-                "products": [],
-                "categories": [],
-                "orders": []
-            }
-            try:
-                self.save_data(initial_data)
+        # One connection per process; the lock serializes access from uvicorn's threadpool
+        self._lock = threading.RLock()
+        # Read-mostly catalog cache, valid while PRAGMA data_version is unchanged
+        self._catalog_payload = None
+        self._catalog_version = None
+        self._catalog_etag = None
+        self._products_by_id = {}
+        fresh = not os.path.exists(DB_FILE)
+        self._conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if fresh:
+            self.init_data()
+
+    def init_data(self):
+        try:
+            if os.path.exists(DATA_FILE):
+                self.migrate_json_file()
+            else:
                 self.seed_data()
-            except Exception as e:
-                logger.error(f"Error creating data file: {e}")
+        except Exception as e:
+            logger.error(f"Error initializing database: {e}")
+
+    def migrate_json_file(self):
+        with open(DATA_FILE, 'rb') as f:
+            data = orjson.loads(f.read())
+        self.replace_data(data)
+        logger.info(f"Imported legacy data from {DATA_FILE}")
+
+    # --- Row mapping ---
+    @staticmethod
+    def _product_from_row(row):
+        return {
+            "id": row["id"],
+            "name": orjson.loads(row["name_json"]),
+            "description": orjson.loads(row["description_json"]),
+            "price": row["price"],
+            "discount": row["discount"],
+            "category": row["category"],
+            "image": row["image"]
+        }
 
-    def load_data(self):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"products": [], "categories": [], "orders": []}
+    @staticmethod
+    def _category_from_row(row):
+        return {"id": row["id"], "name": orjson.loads(row["name_json"])}
+
+    @staticmethod
+    def _order_from_row(row):
+        return {
+            "id": row["id"],
+            "date": row["date"],
+            "customer": orjson.loads(row["customer_json"]),
+            "items": orjson.loads(row["items_json"]),
+            "total_omr": row["total_omr"],
+            "total_usd": row["total_usd"],
+            "status": row["status"],
+            "paid": bool(row["paid"]),
+            "paypal_order_id": row["paypal_order_id"]
+        }
 
-    def save_data(self, data):
-        try:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            logger.error(f"Error saving data: {e}")
+    @staticmethod
+    def _product_params(p):
+        return (
+            p["id"], orjson.dumps(p["name"]).decode(), orjson.dumps(p["description"]).decode(),
+            p["price"], p.get("discount", 0), p["category"], p["image"]
+        )
+
+    @staticmethod
+    def _category_params(c):
+        return (c["id"], orjson.dumps(c["name"]).decode())
+
+    @staticmethod
+    def _order_params(o):
+        return (
+            o["id"], o["date"], orjson.dumps(o["customer"]).decode(), orjson.dumps(o["items"]).decode(),
+            o["total_omr"], o["total_usd"], o["status"], int(o.get("paid", False)), o.get("paypal_order_id")
+        )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    def _invalidate_catalog(self):
+        # data_version only tracks commits from other connections, so our own writes reset the cache here
+        with self._lock:
+            self._catalog_payload = None
+
+    # --- Reads ---
+    def get_products(self):
+        return [self._product_from_row(r) for r in self._query("SELECT * FROM products ORDER BY rowid")]
+
+    def get_categories(self):
+        return [self._category_from_row(r) for r in self._query("SELECT * FROM categories ORDER BY rowid")]
+
+    def get_orders(self):
+        return [self._order_from_row(r) for r in self._query("SELECT * FROM orders ORDER BY rowid")]
+
+    def _refresh_catalog(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._catalog_payload is None or version != self._catalog_version:
+                products = self.get_products()
+                # Serialized once per change so /api/data never re-encodes the catalog
+                self._catalog_payload = orjson.dumps({
+                    "products": products,
+                    "categories": self.get_categories()
+                })
+                # Discounted unit prices are folded in here so pricing an order is one lookup per item
+                self._products_by_id = {p["id"]: (p, p["price"] * (1 - p["discount"] / 100)) for p in products}
+                # Content hash, so every worker derives the same ETag for the same catalog
+                self._catalog_etag = '"' + hashlib.blake2b(self._catalog_payload, digest_size=16).hexdigest() + '"'
+                self._catalog_version = version
+
+    def get_catalog(self):
+        # Returns (JSON bytes, etag) for the public products/categories payload
+        with self._lock:
+            self._refresh_catalog()
+            return self._catalog_payload, self._catalog_etag
+
+    def get_products_by_id(self):
+        # Read-only id -> (product, final unit price) index, rebuilt together with the catalog
+        with self._lock:
+            self._refresh_catalog()
+            return self._products_by_id
+
+    def get_order(self, oid):
+        rows = self._query("SELECT * FROM orders WHERE id = ?", (oid,))
+        return self._order_from_row(rows[0]) if rows else None
+
+    def load_data(self):
+        # Read all tables inside one transaction so backups are a consistent snapshot
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                return {
+                    "products": self.get_products(),
+                    "categories": self.get_categories(),
+                    "orders": self.get_orders()
+                }
+            finally:
+                self._conn.commit()
+
+    # --- Writes ---
+    def save_product(self, product):
+        self._write("""
+            INSERT INTO products (id, name_json, description_json, price, discount, category, image)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                name_json = excluded.name_json, description_json = excluded.description_json,
+                price = excluded.price, discount = excluded.discount,
+                category = excluded.category, image = excluded.image
+        """, self._product_params(product))
+        self._invalidate_catalog()
+
+    def delete_product(self, pid):
+        deleted = self._write("DELETE FROM products WHERE id = ?", (pid,))
+        if deleted:
+            self._invalidate_catalog()
+        return deleted
+
+    def save_category(self, category):
+        self._write("""
+            INSERT INTO categories (id, name_json) VALUES (?, ?)
+            ON CONFLICT(id) DO UPDATE SET name_json = excluded.name_json
+        """, self._category_params(category))
+        self._invalidate_catalog()
+
+    def delete_category(self, cid):
+        deleted = self._write("DELETE FROM categories WHERE id = ?", (cid,))
+        if deleted:
+            self._invalidate_catalog()
+        return deleted
+
+    def add_order(self, order):
+        self._write("""
+            INSERT INTO orders (id, date, customer_json, items_json, total_omr, total_usd, status, paid, paypal_order_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, self._order_params(order))
+
+    def update_order_status(self, oid, status, paid=None):
+        if paid is None:
+            return self._write("UPDATE orders SET status = ? WHERE id = ?", (status, oid))
+        return self._write("UPDATE orders SET status = ?, paid = ? WHERE id = ?", (status, int(paid), oid))
+
+    def replace_data(self, data):
+        # Full restore in a single transaction: either everything is replaced or nothing is
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM products")
+            self._conn.execute("DELETE FROM categories")
+            self._conn.execute("DELETE FROM orders")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._product_params(p) for p in data.get("products", [])]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO categories VALUES (?, ?)",
+                [self._category_params(c) for c in data.get("categories", [])]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._order_params(o) for o in data.get("orders", [])]
+            )
+        self._invalidate_catalog()
+
+    def close(self):
+        # Fold the WAL back into data.db so the file on disk is self-contained
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
 
     def seed_data(self):
-        data = self.load_data()
-        if not data["categories"]:
-            data["categories"] = [
+        self.replace_data({
+            "categories": [
                 {"id": "1", "name": {"fa": "پیش غذا", "en": "Appetizers", "ar": "المقبلات"}},
                 {"id": "2", "name": {"fa": "غذای اصلی", "en": "Main Course", "ar": "الطبق الرئيسي"}},
-            ]
-        if not data["products"]:
-            data["products"] = [
+            ],
+            "products": [
                 {
                     "id": "1",
                     "name": {"fa": "استیک فیله مینیون", "en": "Filet Mignon Steak", "ar": "ستيك فيليه مينيون"},
@@ -141,25 +422,37 @@ class DataManager:
                     "category": "2",
                     "image": "https://images.unsplash.com/photo-1600891964092-4316c288032e?w=400"
                 }
-            ]
-        self.save_data(data)
+            ],
+            "orders": []
+        })
 
 db = DataManager()
 
 # ============ Services ============
 class PayPalService:
+    def __init__(self):
+        self._token = None
+        self._token_exp = 0
+        self._lock = asyncio.Lock()
+
     async def get_access_token(self):
         if not PAYPAL_CLIENT_ID or not PAYPAL_SECRET:
             logger.error("PayPal credentials missing")
             return None
             
-        async with httpx.AsyncClient() as client:
+        # Reuse the token until a minute before expiry; the lock prevents concurrent refreshes
+        async with self._lock:
+            if self._token and time.monotonic() < self._token_exp - 60:
+                return self._token
             try:
                 auth = (PAYPAL_CLIENT_ID, PAYPAL_SECRET)
                 data = {"grant_type": "client_credentials"}
-                response = await client.post(f"{PAYPAL_API_BASE}/v1/oauth2/token", auth=auth, data=data)
+                response = await app.state.http.post(f"{PAYPAL_API_BASE}/v1/oauth2/token", auth=auth, data=data)
                 response.raise_for_status()
-                return response.json()["access_token"]
+                token_data = response.json()
+                self._token = token_data["access_token"]
+                self._token_exp = time.monotonic() + token_data.get("expires_in", 0)
+                return self._token
             except Exception as e:
                 logger.error(f"PayPal Token Error: {e}")
                 raise
@@ -184,10 +477,9 @@ class PayPalService:
                 "user_action": "PAY_NOW"
             }
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{PAYPAL_API_BASE}/v2/checkout/orders", headers=headers, json=order_data)
-            response.raise_for_status()
-            return response.json()
+        response = await app.state.http.post(f"{PAYPAL_API_BASE}/v2/checkout/orders", headers=headers, json=order_data)
+        response.raise_for_status()
+        return response.json()
 
     async def capture_payment(self, order_id: str):
         token = await self.get_access_token()
@@ -195,10 +487,9 @@ class PayPalService:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {token}"
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{PAYPAL_API_BASE}/v2/checkout/orders/{order_id}/capture", headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = await app.state.http.post(f"{PAYPAL_API_BASE}/v2/checkout/orders/{order_id}/capture", headers=headers)
+        response.raise_for_status()
+        return response.json()
 
 class TelegramService:
     async def send_order(self, order: dict):
@@ -206,41 +497,44 @@ class TelegramService:
             logger.warning("Telegram credentials missing, skipping notification")
             return
 
+        customer = order['customer']
         items_text = "\n".join([f"• {item['name']['fa']} × {item['quantity']} = {item['price']*item['quantity']:.2f} OMR" for item in order['items']])
-        message = f"""
-🛒 *سفارش جدید* (#{order['id']})
-
-👤 *مشتری:* {order['customer']['firstName']} {order['customer']['lastName']}
-📞 *تلفن:* {order['customer']['phone']}
-📍 *آدرس:* {order['customer']['address']}
-{f"🗺 *لوکیشن:* {order['customer']['location']}" if order['customer']['location'] else ""}
-
-📦 *محصولات:*
-{items_text}
-
-💰 *مبلغ کل:* {order['total_omr']:.2f} OMR
-💵 *پرداخت شده:* {order['total_usd']:.2f} USD
-
-🚚 *تحویل:* {'ارسال' if order['customer']['deliveryType'] == 'delivery' else 'حضوری'}
-📝 *توضیحات:* {order['customer']['notes'] or '-'}
-        """
+        message = TELEGRAM_ORDER_TEMPLATE.format_map({
+            "id": order['id'],
+            "first_name": customer['firstName'],
+            "last_name": customer['lastName'],
+            "phone": customer['phone'],
+            "address": customer['address'],
+            "location_line": f"🗺 *لوکیشن:* {customer['location']}" if customer['location'] else "",
+            "items_text": items_text,
+            "total_omr": order['total_omr'],
+            "total_usd": order['total_usd'],
+            "delivery": 'ارسال' if customer['deliveryType'] == 'delivery' else 'حضوری',
+            "notes": customer['notes'] or '-'
+        })
         
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TELEGRAM_CHAT_ID,
             "text": message,
             "parse_mode": "Markdown"
         }
         try:
-            async with httpx.AsyncClient() as client:
-                await client.post(url, json=payload)
+            await app.state.http.post(TELEGRAM_URL, json=payload)
         except Exception as e:
             logger.error(f"Telegram error: {e}")
 
 paypal_service = PayPalService()
 telegram_service = TelegramService()
 
+async def send_order_notification(order: dict):
+    try:
+        await telegram_service.send_order(order)
+    except Exception as e:
+        logger.error(f"Telegram Failed: {e}")
+
 # ============ Routes ============
+# Handlers that only touch the database are plain `def` so FastAPI runs them in its threadpool;
+# async handlers wrap database calls in run_in_threadpool.
 
 @app.get("/")
 async def read_root():
@@ -258,94 +552,67 @@ async def read_success():
 # --- Public API Endpoints ---
 
 @app.get("/api/data")
-async def get_data():
-    data = db.load_data()
-    return {
-        "products": data["products"],
-        "categories": data["categories"]
-    }
+def get_data(request: Request):
+    payload, etag = db.get_catalog()
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=30"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 # --- Protected Admin API Endpoints ---
 
 @app.post("/api/admin/login")
-async def admin_login(payload: Dict[str, str]):
+async def admin_login(payload: LoginRequest):
     # This endpoint verifies if the entered token is correct
-    if payload.get("token") == ADMIN_TOKEN:
+    if is_admin_token(payload.token):
         return {"status": "success"}
     raise HTTPException(status_code=401, detail="Invalid Token")
 
 @app.get("/api/admin/full-data")
-async def get_admin_data(authorized: bool = Depends(verify_admin)):
+def get_admin_data(authorized: bool = Depends(verify_admin)):
     return db.load_data()
 
 @app.post("/api/admin/product")
-async def save_product(product: Product, authorized: bool = Depends(verify_admin)):
-    data = db.load_data()
-    existing = next((i for i, p in enumerate(data["products"]) if p["id"] == product.id), None)
-    
-    product_dict = product.dict()
-    if existing is not None:
-        data["products"][existing] = product_dict
-    else:
-        data["products"].append(product_dict)
-    
-    db.save_data(data)
+def save_product(product: Product, authorized: bool = Depends(verify_admin)):
+    db.save_product(product.model_dump())
     return {"status": "success"}
 
 @app.delete("/api/admin/product/{pid}")
-async def delete_product(pid: str, authorized: bool = Depends(verify_admin)):
-    data = db.load_data()
-    data["products"] = [p for p in data["products"] if p["id"] != pid]
-    db.save_data(data)
+def delete_product(pid: str, authorized: bool = Depends(verify_admin)):
+    db.delete_product(pid)
     return {"status": "success"}
 
 @app.post("/api/admin/category")
-async def save_category(category: Category, authorized: bool = Depends(verify_admin)):
-    data = db.load_data()
-    existing = next((i for i, c in enumerate(data["categories"]) if c["id"] == category.id), None)
-    
-    cat_dict = category.dict()
-    if existing is not None:
-        data["categories"][existing] = cat_dict
-    else:
-        data["categories"].append(cat_dict)
-    
-    db.save_data(data)
+def save_category(category: Category, authorized: bool = Depends(verify_admin)):
+    db.save_category(category.model_dump())
     return {"status": "success"}
 
 @app.delete("/api/admin/category/{cid}")
-async def delete_category(cid: str, authorized: bool = Depends(verify_admin)):
-    data = db.load_data()
-    data["categories"] = [c for c in data["categories"] if c["id"] != cid]
-    db.save_data(data)
+def delete_category(cid: str, authorized: bool = Depends(verify_admin)):
+    db.delete_category(cid)
     return {"status": "success"}
 
 @app.post("/api/admin/order-status")
-async def update_order_status(payload: Dict[str, str], authorized: bool = Depends(verify_admin)):
-    order_id = payload.get("id")
-    status = payload.get("status")
-    data = db.load_data()
-    for order in data["orders"]:
-        if order["id"] == order_id:
-            order["status"] = status
-            db.save_data(data)
-            return {"status": "success"}
+def update_order_status(payload: OrderStatusUpdate, authorized: bool = Depends(verify_admin)):
+    if db.update_order_status(payload.id, payload.status):
+        return {"status": "success"}
     raise HTTPException(status_code=404, detail="Order not found")
 
 @app.get("/api/admin/backup")
-async def download_backup(token: str):
+def download_backup(token: str):
     # Query param token for file download (Header not possible in simple href)
-    if token != ADMIN_TOKEN:
+    if not is_admin_token(token):
         raise HTTPException(status_code=403)
-    return FileResponse(DATA_FILE, filename="backup.json")
+    return ORJSONResponse(db.load_data(), headers={"Content-Disposition": 'attachment; filename="backup.json"'})
 
 @app.post("/api/admin/restore")
 async def restore_backup(file: UploadFile = File(...), authorized: bool = Depends(verify_admin)):
     content = await file.read()
     try:
-        json_content = json.loads(content)
+        # Parsing and the bulk insert are CPU/disk bound; keep them off the event loop
+        json_content = await run_in_threadpool(orjson.loads, content)
         if "products" in json_content and "categories" in json_content:
-            db.save_data(json_content)
+            await run_in_threadpool(db.replace_data, json_content)
             return {"status": "success"}
     except:
         pass
@@ -355,16 +622,15 @@ async def restore_backup(file: UploadFile = File(...), authorized: bool = Depend
 
 @app.post("/api/order/create")
 async def create_order(request: Request, order_req: OrderRequest):
-    data = db.load_data()
-    
     # Calculate Total Server Side
     calculated_total = 0
     full_items = []
+    products = await run_in_threadpool(db.get_products_by_id)
     
     for item in order_req.items:
-        prod = next((p for p in data["products"] if p["id"] == item.id), None)
-        if prod:
-            final_price = prod["price"] * (1 - prod["discount"] / 100)
+        entry = products.get(item.id)
+        if entry:
+            prod, final_price = entry
             calculated_total += final_price * item.quantity
             full_items.append({
                 "id": prod["id"],
@@ -375,8 +641,8 @@ async def create_order(request: Request, order_req: OrderRequest):
     
     total_usd = calculated_total * OMR_TO_USD_RATE
     
-    # Create Temp Order ID
-    order_id = str(int(datetime.now().timestamp() * 1000))
+    # Random Order ID (timestamp-based IDs collide when two orders land in the same millisecond)
+    order_id = secrets.token_hex(8)
     
     # Create PayPal Payment
     try:
@@ -390,8 +656,8 @@ async def create_order(request: Request, order_req: OrderRequest):
         # Save Pending Order
         new_order = {
             "id": order_id,
-            "date": datetime.now().isoformat(),
-            "customer": order_req.customer.dict(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "customer": order_req.customer.model_dump(),
             "items": full_items,
             "total_omr": calculated_total,
             "total_usd": total_usd,
@@ -400,8 +666,7 @@ async def create_order(request: Request, order_req: OrderRequest):
             "paypal_order_id": paypal_order["id"]
         }
         
-        data["orders"].append(new_order)
-        db.save_data(data)
+        await run_in_threadpool(db.add_order, new_order)
         
         return {"approval_url": approve_link}
         
@@ -411,14 +676,11 @@ async def create_order(request: Request, order_req: OrderRequest):
 
 @app.get("/api/payment/success")
 async def payment_success(oid: str, token: str):
-    data = db.load_data()
-    order_idx = next((i for i, o in enumerate(data["orders"]) if o["id"] == oid), None)
+    order = await run_in_threadpool(db.get_order, oid)
     
-    if order_idx is None:
+    if order is None:
         return RedirectResponse("/?error=order_not_found")
     
-    order = data["orders"][order_idx]
-    
     try:
         # Capture Payment
         await paypal_service.capture_payment(token)
@@ -426,14 +688,12 @@ async def payment_success(oid: str, token: str):
         # Update Order
         order["status"] = "confirmed"
         order["paid"] = True
-        data["orders"][order_idx] = order
-        db.save_data(data)
+        await run_in_threadpool(db.update_order_status, oid, order["status"], paid=True)
         
-        # Send Telegram Notification (Try/Except)
-        try:
-            await telegram_service.send_order(order)
-        except Exception as e:
-            logger.error(f"Telegram Failed: {e}")
+        # Send Telegram Notification in the background so the redirect isn't delayed
+        task = asyncio.create_task(send_order_notification(order))
+        app.state.bg.add(task)
+        task.add_done_callback(app.state.bg.discard)
         
         return RedirectResponse(f"/success?oid={oid}")
         
@@ -446,13 +706,14 @@ async def payment_cancel():
     return RedirectResponse("/?error=payment_cancelled")
 
 @app.get("/api/order/{oid}")
-async def get_order_detail(oid: str):
-    data = db.load_data()
-    order = next((o for o in data["orders"] if o["id"] == oid), None)
+def get_order_detail(oid: str):
+    order = db.get_order(oid)
     if order:
         return order
     raise HTTPException(status_code=404, detail="Not found")
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # "auto" picks uvloop/httptools when installed; scale out in production via WEB_CONCURRENCY
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="auto", http="auto", workers=workers)
\ No newline at end of file